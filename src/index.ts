@@ -21,10 +21,37 @@ import {
   Tool,
 } from '@modelcontextprotocol/sdk/types.js';
 import axios from 'axios';
+import https from 'https';
 
 // Italian Jokes API configuration
 const ITALIAN_JOKES_API_BASE = 'https://italian-jokes.vercel.app/api/jokes';
 
+// Shared keep-alive agent so repeated requests reuse TCP/TLS connections
+// instead of re-handshaking on every call. Mirrors the Node 19+ global
+// agent defaults (idle sockets closed after 5s) on older runtimes too.
+const jokesApiAgent = new https.Agent({
+  keepAlive: true,
+  timeout: 5000,
+  maxSockets: 4,
+});
+
+const jokesApiClient = axios.create({
+  baseURL: ITALIAN_JOKES_API_BASE,
+  timeout: 10000,
+  httpsAgent: jokesApiAgent,
+  headers: {
+    'Accept': 'application/json',
+    'User-Agent': 'Italian-Jokes-MCP-Server/1.0.0',
+  },
+});
+
+// Most jokes kept ready per subtype; each served joke triggers at most
+// one background fetch to replace it
+const JOKE_BUFFER_SIZE = 5;
+
+// Pause background refills for a subtype after one fails
+const JOKE_REFILL_BACKOFF_MS = 60000;
+
 // Available joke subtypes
 const JOKE_SUBTYPES = [
   'All',
@@ -37,6 +64,47 @@ const JOKE_SUBTYPES = [
 
 type JokeSubtype = typeof JOKE_SUBTYPES[number];
 
+// Precomputed once so request validation is a hash lookup
+const JOKE_SUBTYPE_SET: ReadonlySet<string> = new Set(JOKE_SUBTYPES);
+const JOKE_SUBTYPE_LIST_STR = JOKE_SUBTYPES.join(', ');
+
+// Tool definitions are static, so build them once at module load
+const TOOLS = [
+  {
+    name: 'get_italian_joke',
+    description: 'Get a random Italian joke or a joke of a specific subtype',
+    inputSchema: {
+      type: 'object',
+      properties: {
+        subtype: {
+          type: 'string',
+          description: 'The subtype of joke to fetch',
+          enum: JOKE_SUBTYPES,
+        },
+      },
+      additionalProperties: false,
+    },
+  },
+  {
+    name: 'list_joke_subtypes',
+    description: 'List all available Italian joke subtypes',
+    inputSchema: {
+      type: 'object',
+      properties: {},
+      additionalProperties: false,
+    },
+  },
+] satisfies Tool[];
+
+// Static response text for list_joke_subtypes
+const JOKE_SUBTYPES_TEXT = `🇮🇹 **Available Italian Joke Subtypes:**
+
+${JOKE_SUBTYPES.map((subtype, index) => `${index + 1}. **${subtype}**${subtype === 'All' ? ' (Random from all subtypes)' : ''}`).join('\n')}
+
+Use the \`get_italian_joke\` tool with the \`subtype\` parameter to get jokes of a specific type, or omit the parameter for a random joke.
+
+*Viva la risata! (Long live laughter!)*`;
+
 interface JokeResponse {
   id: number;
   joke: string;
@@ -46,6 +114,9 @@ interface JokeResponse {
 
 class ItalianJokesServer {
   private server: Server;
+  private jokeBuffers = new Map<JokeSubtype, JokeResponse[]>();
+  private refillingSubtypes = new Set<JokeSubtype>();
+  private refillBlockedUntil = new Map<JokeSubtype, number>();
 
   constructor() {
     this.server = new Server(
@@ -68,40 +139,14 @@ class ItalianJokesServer {
     this.server.onerror = (error) => console.error('[MCP Error]', error);
     process.on('SIGINT', async () => {
       await this.server.close();
+      jokesApiAgent.destroy();
       process.exit(0);
     });
   }
 
   private setupToolHandlers(): void {
     this.server.setRequestHandler(ListToolsRequestSchema, async () => {
-      return {
-        tools: [
-          {
-            name: 'get_italian_joke',
-            description: 'Get a random Italian joke or a joke of a specific subtype',
-            inputSchema: {
-              type: 'object',
-              properties: {
-                subtype: {
-                  type: 'string',
-                  description: 'The subtype of joke to fetch',
-                  enum: JOKE_SUBTYPES,
-                },
-              },
-              additionalProperties: false,
-            },
-          },
-          {
-            name: 'list_joke_subtypes',
-            description: 'List all available Italian joke subtypes',
-            inputSchema: {
-              type: 'object',
-              properties: {},
-              additionalProperties: false,
-            },
-          },
-        ] satisfies Tool[],
-      };
+      return { tools: TOOLS };
     });
 
     this.server.setRequestHandler(CallToolRequestSchema, async (request) => {
@@ -109,8 +154,14 @@ class ItalianJokesServer {
 
       try {
         switch (name) {
-          case 'get_italian_joke':
-            return await this.getItalianJoke(args?.subtype as JokeSubtype);
+          case 'get_italian_joke': {
+            // Falsy values (undefined, null, '') have always meant 'All'
+            const subtype = args?.subtype || undefined;
+            if (subtype !== undefined && (typeof subtype !== 'string' || !JOKE_SUBTYPE_SET.has(subtype))) {
+              throw new Error(`Invalid subtype: ${String(subtype)}. Available subtypes: ${JOKE_SUBTYPE_LIST_STR}`);
+            }
+            return await this.getItalianJoke(subtype as JokeSubtype | undefined);
+          }
 
           case 'list_joke_subtypes':
             return await this.listJokeSubtypes();
@@ -134,21 +185,7 @@ class ItalianJokesServer {
 
   private async getItalianJoke(subtype?: JokeSubtype) {
     try {
-      let url = ITALIAN_JOKES_API_BASE;
-      
-      if (subtype && subtype !== 'All') {
-        url += `?subtype=${encodeURIComponent(subtype)}`;
-      }
-
-      const response = await axios.get<JokeResponse>(url, {
-        timeout: 10000,
-        headers: {
-          'Accept': 'application/json',
-          'User-Agent': 'Italian-Jokes-MCP-Server/1.0.0',
-        },
-      });
-
-      const joke = response.data;
+      const joke = await this.nextJoke(subtype ?? 'All');
 
       return {
         content: [
@@ -177,18 +214,61 @@ ${joke.joke}
     }
   }
 
+  private async fetchJoke(subtype: JokeSubtype): Promise<JokeResponse> {
+    const params = subtype !== 'All' ? { subtype } : undefined;
+    const response = await jokesApiClient.get<JokeResponse>('', { params });
+    return response.data;
+  }
+
+  private async nextJoke(subtype: JokeSubtype): Promise<JokeResponse> {
+    const buffered = this.jokeBuffers.get(subtype)?.shift();
+    if (buffered) {
+      void this.refillJokeBuffer(subtype, buffered);
+      return buffered;
+    }
+
+    // Underflow: only the caller's own request goes out, and a refill
+    // starts once the upstream has answered. A direct success lifts any
+    // refill backoff.
+    const joke = await this.fetchJoke(subtype);
+    this.refillBlockedUntil.delete(subtype);
+    void this.refillJokeBuffer(subtype, joke);
+    return joke;
+  }
+
+  private async refillJokeBuffer(subtype: JokeSubtype, served: JokeResponse): Promise<void> {
+    if (this.refillingSubtypes.has(subtype) || Date.now() < (this.refillBlockedUntil.get(subtype) ?? 0)) {
+      return;
+    }
+
+    const buffer = this.jokeBuffers.get(subtype) ?? [];
+    this.jokeBuffers.set(subtype, buffer);
+    if (buffer.length >= JOKE_BUFFER_SIZE) {
+      return;
+    }
+
+    // A single fetch per served joke; a repeat of the joke just served or
+    // one already queued is discarded rather than retried
+    this.refillingSubtypes.add(subtype);
+    try {
+      const joke = await this.fetchJoke(subtype);
+      if (joke.id !== served.id && !buffer.some((queued) => queued.id === joke.id)) {
+        buffer.push(joke);
+      }
+    } catch (error) {
+      console.error(`[Prefetch Error] ${subtype}`, error instanceof Error ? error.message : error);
+      this.refillBlockedUntil.set(subtype, Date.now() + JOKE_REFILL_BACKOFF_MS);
+    } finally {
+      this.refillingSubtypes.delete(subtype);
+    }
+  }
+
   private async listJokeSubtypes() {
     return {
       content: [
         {
           type: 'text',
-          text: `🇮🇹 **Available Italian Joke Subtypes:**
-
-${JOKE_SUBTYPES.map((subtype, index) => `${index + 1}. **${subtype}**${subtype === 'All' ? ' (Random from all subtypes)' : ''}`).join('\n')}
-
-Use the \`get_italian_joke\` tool with the \`subtype\` parameter to get jokes of a specific type, or omit the parameter for a random joke.
-
-*Viva la risata! (Long live laughter!)*`,
+          text: JOKE_SUBTYPES_TEXT,
         },
       ],
     };